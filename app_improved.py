@@ -1,16 +1,36 @@
-from flask import Flask, render_template_string, Response
+from aiohttp import web
+import asyncio
 import cv2
-import RPi.GPIO as GPIO
+import gpiod
+from gpiod.line import Direction, Value
+import math
+import os
+import queue
+import threading
 import time
 import torch
 import numpy as np
+try:
+    from executorch.extension.pybindings.portable_lib import _load_for_executorch
+except ImportError:
+    _load_for_executorch = None
+
+# libjpeg-turbo (NEON SIMD) for JPEG encode/decode. Falls back to OpenCV if missing.
+# Install with: sudo apt install libturbojpeg0 && pip install PyTurboJPEG
+try:
+    from turbojpeg import TurboJPEG
+    jpeg = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    jpeg = None
 
-app = Flask(__name__)
+routes = web.RouteTableDef()
 
 # --- 1. Hardware & Model Setup ---
 
 # Motor pins (adjust to match your wiring)
 IN1, IN2, IN3, IN4 = 17, 27, 22, 5
+# GPIO chip of the 40-pin header. Pi 5 on kernels older than 6.6.45 uses '/dev/gpiochip4'.
+GPIO_CHIP = '/dev/gpiochip0'
 
 # Initialize Camera
 # We use a try/except block to handle camera initialization issues gracefully
@@ -22,96 +42,362 @@ try:
     if not camera.isOpened():
         print("Warning: Could not open video source 0. Trying -1.")
         camera = cv2.VideoCapture(-1)
+    # Ask the camera for MJPEG and hand us the JPEG bytes as-is (no decode in OpenCV).
+    # Frames without boxes can then be streamed to the browser without re-encoding.
+    camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
     # Lowering resolution can help improve FPS on Pi when running AI
     camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
     camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Keep at most one frame queued inside OpenCV to reduce video lag
+    camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    # With CONVERT_RGB off, OpenCV hands over whatever format the driver picked
+    # (e.g. H x W x 2 YUYV). If that isn't MJPEG, let OpenCV convert to BGR again.
+    if int(camera.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*'MJPG'):
+        print("Warning: camera doesn't support MJPEG. Using OpenCV's BGR conversion.")
+        camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
 except Exception as e:
     print(f"Error initializing camera: {e}")
 
+# Background Camera Reader
+class CameraReader:
+    # Reads the camera on a background thread and keeps only the newest frame.
+    # The video generator never blocks on camera.read(), and frames never pile
+    # up (stale) in OpenCV's internal buffer while inference is running.
+    # on_frame(frame_id, frame) is called from the reader thread for every new frame.
+    def __init__(self, capture, on_frame=None):
+        self.capture = capture
+        self.on_frame = on_frame
+        self.condition = threading.Condition()
+        self.latest = None
+        self.frame_id = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread.start()
+
+    def _reader(self):
+        while self.running:
+            success, frame = self.capture.read()
+            with self.condition:
+                if success:
+                    self.latest = frame
+                    # Wraps around (1..65536, never 0) so it stays a small int on long runs
+                    self.frame_id = (self.frame_id & 0xFFFF) + 1
+                else:
+                    self.running = False
+                self.condition.notify_all()
+            if success and self.on_frame:
+                self.on_frame(self.frame_id, frame)
+
+    def read(self, last_id=0):
+        # Wait for a frame newer than last_id. Returns (frame_id, frame),
+        # or (None, None) once the camera has stopped.
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_id != last_id or not self.running)
+            if not self.running:
+                return None, None
+            return self.frame_id, self.latest
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=1)
+
 # Initialize GPIO
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-for pin in [IN1, IN2, IN3, IN4]:
-    GPIO.setup(pin, GPIO.OUT)
-    GPIO.output(pin, False)
+# libgpiod v2: all four motor pins are claimed as one request, so each motor
+# command below updates them together in a single call (one ioctl).
+motor_lines = gpiod.request_lines(
+    GPIO_CHIP,
+    consumer='motors',
+    config={(IN1, IN2, IN3, IN4): gpiod.LineSettings(direction=Direction.OUTPUT,
+                                                     output_value=Value.INACTIVE)},
+)
+
+ON, OFF = Value.ACTIVE, Value.INACTIVE
 
 # Initialize YOLO Model
-print("Loading YOLOv5n model... this might take a minute on a Pi...")
-# Using 'ultralytics/yolov5' from torch hub.
-# 'pretrained=True' downloads weights if not present.
-# Specifying 'cpu' device explicitly is good practice on Pi without specialized hardware.
-model = torch.hub.load('ultralytics/yolov5', 'yolov5n', pretrained=True, device='cpu')
+# Both models are created by export_yolov5n.py (nothing is downloaded at startup).
+# Preferred: ExecuTorch program, the whole network runs in ExecuTorch's C++ runtime
+# with XNNPACK (NEON) kernels, no Python between layers.
+# Fallback when ExecuTorch isn't installed: frozen TorchScript module.
+MODEL_PATH = 'yolov5n_xnnpack.pte'
+TORCHSCRIPT_MODEL_PATH = 'yolov5n_ts.pt'
+NUM_THREADS = 4        # Pi 4/5 have 4 cores
+MODEL_IMG_SIZE = 224   # Must match the size used in export_yolov5n.py. Small = fast.
+CONF_THRESHOLD = 0.25  # Ignore detections below this confidence
+IOU_THRESHOLD = 0.45   # Overlap above which duplicate boxes are removed (NMS)
+# How many camera frames to skip between AI detections (starting value only:
+# it is retuned automatically from the measured inference time, and always
+# rounded up to one less than a power of two: 0, 1, 3, 7, ...)
+SKIP_FRAMES = 3
+JPEG_QUALITY = 75      # Browser stream quality (lower = less CPU and Wi-Fi bandwidth)
+JPEG_QUALITY_LOW = 60  # Used while the stream is falling behind the camera
+
+# PyTorch CPU settings: one thread per core for ops, no extra inter-op pool,
+# and NNPACK's NEON Winograd kernels for 3x3 convs when the build includes it.
+torch.set_num_threads(NUM_THREADS)
+torch.set_num_interop_threads(1)
+if torch.backends.nnpack.is_available():
+    torch.backends.nnpack.set_flags(True)
+
+print("Loading YOLOv5n model...")
+if _load_for_executorch and os.path.exists(MODEL_PATH):
+    model_backend = 'executorch'
+    model = _load_for_executorch(MODEL_PATH)
+elif os.path.exists(TORCHSCRIPT_MODEL_PATH):
+    print(f"ExecuTorch runtime or {MODEL_PATH} not available. Using TorchScript.")
+    model_backend = 'torchscript'
+    model = torch.jit.load(TORCHSCRIPT_MODEL_PATH, map_location='cpu')
+    model.eval()
+else:
+    raise SystemExit("Error: no YOLOv5n model found. Run export_yolov5n.py first.")
+# Reusable buffers for preprocessing, so an AI frame allocates nothing:
+# letterboxed BGR canvas -> model input tensor
+letterbox_canvas = np.full((MODEL_IMG_SIZE, MODEL_IMG_SIZE, 3), 114, dtype=np.uint8)
+letterbox_frame_shape = None
+input_buffer = np.empty((1, 3, MODEL_IMG_SIZE, MODEL_IMG_SIZE), dtype=np.float32)
+input_tensor = torch.from_numpy(input_buffer)  # Shares memory with input_buffer
+INV_255 = np.float32(1 / 255.0)
 print("YOLO model loaded successfully!")
 
 
 # --- 2. Motor Functions ---
 def forward():
-    GPIO.output(IN1, True); GPIO.output(IN2, False)
-    GPIO.output(IN3, True); GPIO.output(IN4, False)
+    motor_lines.set_values({IN1: ON, IN2: OFF, IN3: ON, IN4: OFF})
 
 def backward():
-    GPIO.output(IN1, False); GPIO.output(IN2, True)
-    GPIO.output(IN3, False); GPIO.output(IN4, True)
+    motor_lines.set_values({IN1: OFF, IN2: ON, IN3: OFF, IN4: ON})
 
 def left():
     # Tank turn left: Left side back, right side forward
-    GPIO.output(IN1, False); GPIO.output(IN2, True)
-    GPIO.output(IN3, True); GPIO.output(IN4, False)
+    motor_lines.set_values({IN1: OFF, IN2: ON, IN3: ON, IN4: OFF})
 
 def right():
     # Tank turn right: Left side forward, right side back
-    GPIO.output(IN1, True); GPIO.output(IN2, False)
-    GPIO.output(IN3, False); GPIO.output(IN4, True)
+    motor_lines.set_values({IN1: ON, IN2: OFF, IN3: OFF, IN4: ON})
 
 def stop():
-    for pin in [IN1, IN2, IN3, IN4]:
-        GPIO.output(pin, False)
+    motor_lines.set_values({IN1: OFF, IN2: OFF, IN3: OFF, IN4: OFF})
+
+
+# --- 3. YOLO Detection Helpers ---
+COCO_NAMES = (
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat',
+    'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack',
+    'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball',
+    'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket',
+    'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
+    'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
+    'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
+    'toothbrush',
+)
+
+def nms(boxes, scores, class_ids):
+    # Greedy non-maximum suppression. Boxes are shifted apart per class
+    # so that boxes of different classes never suppress each other.
+    offset_boxes = boxes + class_ids[:, None] * 4096.0
+    x1, y1, x2, y2 = offset_boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= IOU_THRESHOLD]
+    return keep
+
+def letterbox(frame):
+    # Resize the frame into the square model input canvas, keeping its aspect ratio
+    # (the unused border stays grey). Returns the scale and padding so boxes can be
+    # mapped back onto the original frame.
+    global letterbox_frame_shape
+    frame_h, frame_w = frame.shape[:2]
+    scale = min(MODEL_IMG_SIZE / frame_w, MODEL_IMG_SIZE / frame_h)
+    new_w, new_h = round(frame_w * scale), round(frame_h * scale)
+    pad_x, pad_y = (MODEL_IMG_SIZE - new_w) // 2, (MODEL_IMG_SIZE - new_h) // 2
+    if letterbox_frame_shape != (frame_h, frame_w):
+        # Camera size changed (or first frame): repaint the grey border
+        letterbox_canvas[:] = 114
+        letterbox_frame_shape = (frame_h, frame_w)
+    cv2.resize(frame, (new_w, new_h), dst=letterbox_canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+               interpolation=cv2.INTER_LINEAR)
+    return scale, pad_x, pad_y
+
+def detect(frame):
+    # Run YOLOv5 on a BGR frame.
+    # Returns (boxes, scores, class_ids) with boxes as x1, y1, x2, y2 in frame pixels.
+    scale, pad_x, pad_y = letterbox(frame)
+    # One pass: BGR->RGB, HWC->CHW and scale to 0..1, written straight into the
+    # model input (input_tensor sees the new values without any copy)
+    np.multiply(letterbox_canvas[:, :, ::-1].transpose(2, 0, 1), INV_255, out=input_buffer[0])
+
+    # inference_mode skips all autograd bookkeeping (cheaper than no_grad)
+    with torch.inference_mode():
+        # pred is N x 85: box centre x, centre y, width, height, objectness, 80 class scores
+        if model_backend == 'executorch':
+            pred = model.forward((input_tensor,))[0][0].numpy()
+        else:
+            pred = model(input_tensor)[0].numpy()
+
+    # Postprocess: drop low-objectness rows first, then pick the best class per box
+    pred = pred[pred[:, 4] > CONF_THRESHOLD]
+    class_scores = pred[:, 5:] * pred[:, 4:5]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(pred)), class_ids]
+    mask = scores > CONF_THRESHOLD
+    pred, class_ids, scores = pred[mask], class_ids[mask], scores[mask]
+    cx, cy, w, h = pred[:, :4].T
+
+    # Map boxes from the letterboxed model input back to the camera frame
+    boxes = np.stack([cx - w / 2 - pad_x, cy - h / 2 - pad_y,
+                      cx + w / 2 - pad_x, cy + h / 2 - pad_y], axis=1) / scale
+
+    keep = nms(boxes, scores, class_ids)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+# One fixed box colour per class, built once at startup
+COLORS = [tuple(color) for color in np.random.default_rng(0).integers(64, 256, (len(COCO_NAMES), 3)).tolist()]
+
+def build_overlay(detections):
+    # Turn detections into ready-to-draw (p1, p2, colour, label, label position) tuples.
+    # Done once per AI result, so streamed frames only have to call cv2 to draw.
+    boxes, scores, class_ids = detections
+    overlay = []
+    for (x1, y1, x2, y2), score, class_id in zip(boxes.astype(np.int32).tolist(),
+                                                 scores.tolist(), class_ids.tolist()):
+        overlay.append(((x1, y1), (x2, y2), COLORS[class_id],
+                        f"{COCO_NAMES[class_id]} {score:.2f}", (x1, max(y1 - 4, 10))))
+    return overlay
 
+def draw_overlay(frame, overlay):
+    # Draw boxes and labels directly onto the BGR frame
+    for p1, p2, color, label, label_pos in overlay:
+        cv2.rectangle(frame, p1, p2, color, 2)
+        cv2.putText(frame, label, label_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return frame
+
+
+# --- 4. Background AI Worker & Video Streaming Generator ---
+# Multipart framing around each JPEG. Written as separate chunks so the JPEG
+# bytes are never copied into a new header + frame + trailer bytes object.
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+FRAME_TRAILER = b'\r\n'
+
+def decode_jpeg(buffer):
+    # Returns None for a corrupt frame (USB webcams send a truncated JPEG now and then)
+    if jpeg:
+        try:
+            return jpeg.decode(buffer)
+        except OSError:
+            return None
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+def encode_jpeg(frame, quality=JPEG_QUALITY):
+    if jpeg:
+        return jpeg.encode(frame, quality=quality)
+    return cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality])[1].tobytes()
+
+def is_jpeg(frame):
+    # Undecoded MJPEG comes back from OpenCV as a single row of JPEG bytes (1 x N).
+    # An H x W x 3 BGR image means the camera isn't sending MJPEG and OpenCV converted it.
+    return frame.ndim < 3
+
+def to_bgr(frame):
+    return decode_jpeg(frame) if is_jpeg(frame) else frame
+
+inference_queue = queue.Queue(maxsize=1)
+latest_overlay = []
+overlay_lock = threading.Lock()
+# Current frame skip as a bit mask, retuned by the AI worker after every inference.
+# The skip is rounded up to one less than a power of two (0, 1, 3, 7, ...), so
+# "every (skip + 1)th frame" is a cheap frame_id & skip_mask == 0 test.
+skip_mask = (1 << SKIP_FRAMES.bit_length()) - 1
+camera_fps = camera.get(cv2.CAP_PROP_FPS) if camera is not None else 0
+frame_interval_ms = 1000.0 / (camera_fps if camera_fps > 0 else 30)
+
+def queue_for_inference(frame_id, frame):
+    # Called by the camera reader for every frame. Hands every (skip_mask + 1)th
+    # frame to the AI worker, replacing any queued frame it hasn't started on yet.
+    if frame_id & skip_mask:
+        return
+    try:
+        inference_queue.get_nowait()
+    except queue.Empty:
+        pass
+    inference_queue.put_nowait(frame)
+
+def inference_worker():
+    # Runs YOLO off the streaming path, so slow inference never stalls the video
+    global latest_overlay, skip_mask
+    while True:
+        frame = inference_queue.get()
+        start = time.perf_counter()
+        try:
+            frame = to_bgr(frame)
+            if frame is None:
+                continue  # Corrupt camera frame, wait for the next one
+            overlay = build_overlay(detect(frame))
+        except Exception as e:
+            # One bad frame must not stop detection for the rest of the run
+            print(f"Inference error: {e}")
+            continue
+        infer_ms = (time.perf_counter() - start) * 1000
+        with overlay_lock:
+            latest_overlay = overlay
+        # Skip just enough frames that the next one is handed over as inference finishes.
+        # Tracks thermal throttling and scene complexity instead of a fixed guess.
+        skip_frames = max(0, math.ceil((infer_ms - frame_interval_ms) / frame_interval_ms))
+        skip_mask = (1 << skip_frames.bit_length()) - 1
+
+threading.Thread(target=inference_worker, daemon=True).start()
+
+camera_reader = None
+if camera is not None and camera.isOpened():
+    camera_reader = CameraReader(camera, on_frame=queue_for_inference)
 
-# --- 3. Video Streaming Generator with YOLO ---
-# --- Modified Video Generator with Frame Skipping ---
 def gen_frames():
-    frame_count = 0
-    # How many raw frames to show between detection frames
-    # Increase this number for smoother video, decrease for faster detection updates
-    SKIP_FRAMES = 4
-    last_annotated_frame = None
+    last_frame_id = 0
 
     while True:
-        if camera is None or not camera.isOpened():
+        if camera_reader is None:
             break
-        success, frame = camera.read()
-        if not success:
+        # Newest frame from the background reader (waits only if none is new yet)
+        frame_id, frame = camera_reader.read(last_frame_id)
+        if frame is None:
             break
         else:
-            # Only run AI if frame_count is a multiple of SKIP_FRAMES + 1
-            if frame_count % (SKIP_FRAMES + 1) == 0:
-                # --- Run heavy AI inference ---
-                results = model(frame)
-                last_annotated_frame = results.render()[0]
-                final_display = last_annotated_frame
-            else:
-                # --- Skip AI, just show video ---
-                # Option A: Show raw video (smoothest)
-                final_display = frame
-
-                # Option B: Show the last known detection results superimposed
-                # (Looks better but might show lagging boxes behind moving objects)
-                # if last_annotated_frame is not None:
-                #      final_display = last_annotated_frame
-                # else:
-                #      final_display = frame
-
-            frame_count += 1
+            # Frames were dropped since our last one: we're falling behind, so encode smaller
+            dropped = last_frame_id and (frame_id - last_frame_id) & 0xFFFF > 1
+            quality = JPEG_QUALITY_LOW if dropped else JPEG_QUALITY
+            last_frame_id = frame_id
 
-            # Encode whatever we decided to display
-            ret, buffer = cv2.imencode('.jpg', final_display)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            # Show live video with the most recent detection boxes from the AI worker
+            # (boxes may lag a few frames behind fast-moving objects)
+            with overlay_lock:
+                overlay = latest_overlay
+            if overlay:
+                # Decoding gives a fresh image; a BGR frame is shared between viewers, so copy it
+                display = decode_jpeg(frame) if is_jpeg(frame) else frame.copy()
+                if display is None:
+                    continue  # Corrupt camera frame, skip it
+                yield encode_jpeg(draw_overlay(display, overlay), quality)
+            elif is_jpeg(frame):
+                # Nothing to draw: pass the camera's own JPEG straight through
+                yield frame.tobytes()
+            else:
+                yield encode_jpeg(frame, quality)
 
 
-# --- 4. Flask Routes & HTML ---
+# --- 5. Routes & HTML ---
 html_template = """
 <!doctype html>
 <html>
@@ -137,7 +423,7 @@ html_template = """
 <body>
     <h1>YOLOv5 Object Detection Car</h1>
     <div id="video-container">
-        <img src="{{ url_for('video_feed') }}">
+        <img src="/video_feed">
     </div>
     <div class="controls">
         <button class="btn-fwd" onclick="sendCommand('forward')">▲</button>
@@ -166,37 +452,67 @@ html_template = """
 </html>
 """
 
-@app.route("/")
-def index():
-    return render_template_string(html_template)
+@routes.get("/")
+async def index(request):
+    return web.Response(text=html_template, content_type='text/html')
 
-@app.route("/video_feed")
-def video_feed():
-    return Response(gen_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+@routes.get("/video_feed")
+async def video_feed(request):
+    # Stream MJPEG straight from the event loop. Reading and encoding a frame
+    # blocks, so each step of gen_frames() runs in a worker thread.
+    resp = web.StreamResponse(headers={'Content-Type': 'multipart/x-mixed-replace; boundary=frame'})
+    await resp.prepare(request)
+    # Ends when gen_frames() runs out (camera stopped, see on_shutdown). The generator
+    # is never close()d here: a worker thread may still be running it.
+    frames = gen_frames()
+    try:
+        while (frame_bytes := await asyncio.to_thread(next, frames, None)) is not None:
+            await resp.write(FRAME_HEADER)
+            await resp.write(frame_bytes)
+            await resp.write(FRAME_TRAILER)
+    except ConnectionResetError:
+        pass  # Viewer closed the page
+    return resp
 
 # --- Command Routes (return simple text for AJAX) ---
-@app.route("/forward")
-def cmd_forward(): forward(); return "Forward OK"
-@app.route("/backward")
-def cmd_backward(): backward(); return "Backward OK"
-@app.route("/left")
-def cmd_left(): left(); return "Left OK"
-@app.route("/right")
-def cmd_right(): right(); return "Right OK"
-@app.route("/stop")
-def cmd_stop(): stop(); return "Stop OK"
+# Served right on the event loop, so a command never waits behind a video frame.
+@routes.get("/forward")
+async def cmd_forward(request): forward(); return web.Response(text="Forward OK")
+@routes.get("/backward")
+async def cmd_backward(request): backward(); return web.Response(text="Backward OK")
+@routes.get("/left")
+async def cmd_left(request): left(); return web.Response(text="Left OK")
+@routes.get("/right")
+async def cmd_right(request): right(); return web.Response(text="Right OK")
+@routes.get("/stop")
+async def cmd_stop(request): stop(); return web.Response(text="Stop OK")
+
+app = web.Application()
+app.add_routes(routes)
+
+async def on_shutdown(app):
+    # Ctrl+C: stop the motors right away, then stop the camera reader. Its stop
+    # flag makes gen_frames() return, so open video streams end instead of
+    # holding up the shutdown.
+    stop()
+    if camera_reader:
+        await asyncio.to_thread(camera_reader.stop)
+
+app.on_shutdown.append(on_shutdown)
 
 
 if __name__ == "__main__":
     try:
         # host='0.0.0.0' makes it accessible on your local network
-        app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
+        # shutdown_timeout: don't wait long for requests still running at Ctrl+C
+        web.run_app(app, host="0.0.0.0", port=5000, shutdown_timeout=2)
     finally:
         # Cleanup hardware when the app closes (Ctrl+C)
         print("Cleaning up GPIO and Camera...")
         stop()
-        GPIO.cleanup()
+        motor_lines.release()
+        if camera_reader:
+            camera_reader.stop()
         if camera and camera.isOpened():
 
             camera.release()
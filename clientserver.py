@@ -1,14 +1,22 @@
 # ==========================================
 # SAVE AS: pi_client.py (RUN ON RASPBERRY PI)
 # ==========================================
+# Streams camera frames to pc_server.py on the PC over one WebSocket and drives
+# the motors with the commands it sends back.
+# Needs: pip install websockets msgpack
 import cv2
-import requests
+import msgpack
 import RPi.GPIO as GPIO
 import time
+from collections import deque
+from websockets.exceptions import WebSocketException
+from websockets.sync.client import connect
 
 # --- CONFIGURATION ---
 # REPLACE WITH YOUR PC'S IP ADDRESS!
-PC_SERVER_URL = "http://192.168.1.X:8000/detect"
+PC_SERVER_URL = "ws://192.168.1.X:8000/ws"
+# Frames in flight at once. 2 = send frame N+1 while the PC is still working on frame N.
+PIPELINE_DEPTH = 2
 
 # GPIO Pins setup (same as before)
 IN1, IN2, IN3, IN4 = 17, 27, 22, 5
@@ -29,42 +37,51 @@ camera = cv2.VideoCapture(0)
 camera.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
 camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
 
-print(f"Connecting to AI Server at {PC_SERVER_URL}...")
-
-try:
+def stream_frames(ws):
+    # Send camera frames over an open WebSocket and act on the replies.
+    # Returns when the camera stops; network errors are raised to the caller.
+    send_times = deque()  # Send time of each frame still waiting for its command
     while True:
         success, frame = camera.read()
-        if not success: break
+        if not success: return
 
         # 1. Encode frame to JPEG format for sending
         _, img_encoded = cv2.imencode('.jpg', frame)
 
-        # 2. Define the payload to send to the PC
-        files = {'image': ('image.jpg', img_encoded.tobytes(), 'image/jpeg')}
+        # 2. Send the frame as one binary message, without waiting for earlier answers
+        ws.send(img_encoded.tobytes())
+        send_times.append(time.time())
+        if len(send_times) < PIPELINE_DEPTH:
+            continue  # Fill the pipeline before waiting for a command
 
-        try:
-            # RECORD START TIME for latency check
-            start_time = time.time()
+        # 3. Wait for the command for the oldest frame in flight
+        data = msgpack.unpackb(ws.recv(timeout=2))
 
-            # 3. Send image to PC and wait for response (BLOCKING)
-            response = requests.post(PC_SERVER_URL, files=files, timeout=2)
+        # Calculate round-trip latency
+        latency = round((time.time() - send_times.popleft()) * 1000) # ms
 
-            # Calculate round-trip latency
-            latency = round((time.time() - start_time) * 1000) # ms
+        # 4. Process response
+        action = data.get("action", "stop")
+        print(f"Latency: {latency}ms | Command received: {action.upper()}")
 
-            # 4. Process response
-            if response.status_code == 200:
-                data = response.json()
-                action = data.get("action", "stop")
-                print(f"Latency: {latency}ms | Command received: {action.upper()}")
+        # 5. Execute Motor Command
+        if action == "forward": forward()
+        elif action == "left": left()
+        elif action == "right": right()
+        else: stop()
 
-                # 5. Execute Motor Command
-                if action == "forward": forward()
-                elif action == "left": left()
-                elif action == "right": right()
-                else: stop()
+print(f"Connecting to AI Server at {PC_SERVER_URL}...")
+
+try:
+    while True:
+        try:
+            # One persistent connection for every frame (reconnects after an error).
+            # compression=None: JPEG doesn't compress further, deflate would only waste CPU.
+            with connect(PC_SERVER_URL, compression=None, open_timeout=2) as ws:
+                stream_frames(ws)
+            break  # Camera stopped
 
-        except requests.exceptions.RequestException as e:
+        except (WebSocketException, TimeoutError, OSError):
             print(f"Network Error: connection to PC lost. Stopping motors.")
             stop()
             time.sleep(1) # Wait a bit before trying again
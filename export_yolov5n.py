@@ -0,0 +1,69 @@
+# ==========================================
+# SAVE AS: export_yolov5n.py (RUN ONCE, ON THE PI)
+# ==========================================
+# Converts YOLOv5n from torch hub into ready-to-run models for app_improved.py,
+# so the Pi never has to download and build the model at startup:
+#   - yolov5n_xnnpack.pte: ExecuTorch program with the whole network delegated to
+#     the XNNPACK backend. Every layer runs inside one C++ runtime with NEON-tuned
+#     kernels (no Python between ops). Needs: pip install executorch
+#   - yolov5n_ts.pt: frozen TorchScript module, used by app_improved.py when the
+#     ExecuTorch runtime isn't installed. Still runs without Python between ops.
+#
+# Run this once before starting app_improved.py:
+#     python export_yolov5n.py
+# Run it on the Pi itself: optimize_for_inference tunes the TorchScript module
+# for the CPU it runs on.
+import torch
+from torch.export import export
+
+try:
+    from executorch.exir import to_edge
+    from executorch.backends.xnnpack.partition.xnnpack_partitioner import XnnpackPartitioner
+except ImportError:
+    to_edge = None
+
+# Must match MODEL_IMG_SIZE in app_improved.py
+MODEL_IMG_SIZE = 224
+OUTPUT_PATH = 'yolov5n_xnnpack.pte'
+TORCHSCRIPT_OUTPUT_PATH = 'yolov5n_ts.pt'
+
+# autoshape=False gives the raw network (no PIL/NumPy pre/post-processing wrapper)
+hub_model = torch.hub.load('ultralytics/yolov5', 'yolov5n', pretrained=True, autoshape=False, device='cpu')
+# Newer yolov5 releases wrap the network in DetectMultiBackend
+net = hub_model.model if hub_model.__class__.__name__ == 'DetectMultiBackend' else hub_model
+net.eval()
+# In export mode the Detect head returns only the (1, N, 85) prediction tensor
+net.model[-1].export = True
+
+
+class YOLOv5Export(torch.nn.Module):
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        return self.net(x)[0]
+
+
+wrapper = YOLOv5Export(net).eval()
+example_input = (torch.zeros(1, 3, MODEL_IMG_SIZE, MODEL_IMG_SIZE),)
+
+# --- TorchScript ---
+# Traced rather than scripted: YOLOv5's Python model code isn't scriptable.
+with torch.no_grad():
+    traced = torch.jit.trace(wrapper, example_input)
+traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+torch.jit.save(traced, TORCHSCRIPT_OUTPUT_PATH)
+print(f"Saved {TORCHSCRIPT_OUTPUT_PATH}")
+
+# --- ExecuTorch + XNNPACK ---
+if to_edge is None:
+    print("ExecuTorch not installed, skipping the .pte export. app_improved.py will use TorchScript.")
+else:
+    with torch.no_grad():
+        exported = export(wrapper, example_input)
+    program = to_edge(exported).to_backend(XnnpackPartitioner()).to_executorch()
+    with open(OUTPUT_PATH, 'wb') as f:
+        f.write(program.buffer)
+    print(f"Saved {OUTPUT_PATH}")
+print("Export complete!")
@@ -0,0 +1,58 @@
+# ==========================================
+# SAVE AS: export_yolov8n.py (RUN ONCE, OFFLINE)
+# ==========================================
+# Converts the stock PyTorch weights into an ONNX model for yolov8n.py.
+# yolov8n.py runs it with ONNX Runtime (XNNPACK execution provider when
+# available), which is much faster on the Pi CPU than PyTorch.
+#
+# The exported model takes the letterboxed RGB image exactly as yolov8n.py
+# holds it: uint8, 1 x H x W x 3. HWC->CHW and the uint8->float conversion
+# happen inside the graph, and the /255 scaling is folded into the first
+# conv's weights, so the Pi does no per-pixel preprocessing pass of its own.
+#
+# Run this once (on the Pi or on a PC) before starting yolov8n.py:
+#     python export_yolov8n.py
+# It creates 'yolov8n.onnx' next to this script.
+import torch
+from ultralytics import YOLO
+from ultralytics.nn.modules import Detect
+
+# Must match MODEL_IMG_SIZE in yolov8n.py. The exported graph is specialized
+# for this input size, so a smaller value means less work per frame.
+MODEL_IMG_SIZE = 224
+OUTPUT_PATH = 'yolov8n.onnx'
+OPSET = 17
+
+net = YOLO('yolov8n.pt').model.float().eval()
+net.fuse()  # Fold BatchNorm into the convs, like the stock ultralytics export
+for module in net.modules():
+    if isinstance(module, Detect):
+        # In export mode the Detect head returns only the (1, 84, N) prediction tensor
+        module.export = True
+        module.format = 'onnx'
+
+
+class YOLOv8Export(torch.nn.Module):
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+        # conv(x / 255) == conv'(x) with the weights divided by 255 (zero padding
+        # stays zero). Folding the scale in here removes a divide over every pixel.
+        first_conv = net.model[0].conv
+        first_conv.weight.data /= 255.0
+
+    def forward(self, x):
+        # x: uint8 RGB, 1 x H x W x 3
+        return self.net(x.permute(0, 3, 1, 2).float())
+
+
+wrapper = YOLOv8Export(net).eval()
+example_input = torch.zeros(1, MODEL_IMG_SIZE, MODEL_IMG_SIZE, 3, dtype=torch.uint8)
+
+with torch.no_grad():
+    # dynamo=False: the TorchScript-based exporter keeps the module names (model.22/...)
+    # in the node names, which calibrate.py relies on.
+    torch.onnx.export(wrapper, example_input, OUTPUT_PATH, opset_version=OPSET,
+                      input_names=['images'], output_names=['output0'],
+                      do_constant_folding=True, dynamo=False)
+print(f"Export complete! yolov8n.py will now pick up '{OUTPUT_PATH}'.")
@@ -0,0 +1,152 @@
+# ==========================================
+# SAVE AS: pc_server.py (RUN ON PC)
+# ==========================================
+# AI server for pi_client.py (clientserver.py). The Pi streams camera frames as
+# binary messages over one WebSocket (/ws); for every frame this server runs
+# YOLOv8n and sends back a small msgpack-encoded motor command.
+# Needs: pip install aiohttp msgpack
+#
+# Uses OpenVINO with an INT8 model, the fastest CPU backend for YOLOv8 on a PC.
+# Export the model once (needs: pip install ultralytics openvino nncf):
+#     yolo export model=yolov8n.pt format=openvino int8=True data=coco128.yaml imgsz=320
+# This creates the folder 'yolov8n_int8_openvino_model'.
+import asyncio
+import threading
+import time
+import cv2
+import msgpack
+import numpy as np
+import openvino as ov
+from aiohttp import web
+
+# --- CONFIGURATION ---
+MODEL_PATH = 'yolov8n_int8_openvino_model/yolov8n.xml'
+MODEL_IMG_SIZE = 320   # Must match imgsz used in the export command above
+CONF_THRESHOLD = 0.25  # Ignore detections below this confidence
+IOU_THRESHOLD = 0.45   # Overlap above which duplicate boxes are removed (NMS)
+
+# Driving behaviour: follow the biggest (closest) person in view
+TARGET_CLASS = 0            # COCO class 0 = 'person'
+STOP_AREA_FRACTION = 0.4    # Stop when the target fills this much of the frame (close enough)
+CENTER_BAND = (0.35, 0.65)  # Target centre inside this band (fraction of width) = drive forward
+
+# --- Initialize OpenVINO Model ---
+print("Loading YOLOv8n OpenVINO INT8 model...")
+core = ov.Core()
+# LATENCY hint: optimize for one frame at a time (not throughput), threads picked automatically
+compiled_model = core.compile_model(MODEL_PATH, 'CPU',
+                                    {'PERFORMANCE_HINT': 'LATENCY', 'INFERENCE_NUM_THREADS': '0'})
+# One reusable infer request avoids per-frame setup; the lock keeps frames from
+# several connected clients from using it at the same time.
+infer_request = compiled_model.create_infer_request()
+infer_lock = threading.Lock()
+letterbox_canvas = np.full((MODEL_IMG_SIZE, MODEL_IMG_SIZE, 3), 114, dtype=np.uint8)
+print("Model loaded!")
+
+
+def nms(boxes, scores, class_ids):
+    # Greedy non-maximum suppression. Boxes are shifted apart per class
+    # so that boxes of different classes never suppress each other.
+    offset_boxes = boxes + class_ids[:, None] * 4096.0
+    x1, y1, x2, y2 = offset_boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= IOU_THRESHOLD]
+    return keep
+
+def detect(frame):
+    # Run YOLOv8 on a BGR frame.
+    # Returns (boxes, scores, class_ids) with boxes as x1, y1, x2, y2 in frame pixels.
+    # Letterbox: resize keeping aspect ratio, grey border
+    frame_h, frame_w = frame.shape[:2]
+    scale = min(MODEL_IMG_SIZE / frame_w, MODEL_IMG_SIZE / frame_h)
+    new_w, new_h = round(frame_w * scale), round(frame_h * scale)
+    pad_x, pad_y = (MODEL_IMG_SIZE - new_w) // 2, (MODEL_IMG_SIZE - new_h) // 2
+    letterbox_canvas[:] = 114
+    cv2.resize(frame, (new_w, new_h), dst=letterbox_canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+               interpolation=cv2.INTER_LINEAR)
+    # Single C++ pass: BGR->RGB, scale to 0..1, HWC->CHW (1x3xSxS float32)
+    blob = cv2.dnn.blobFromImage(letterbox_canvas, 1 / 255.0, swapRB=True)
+
+    infer_request.infer({0: blob})
+    pred = infer_request.get_output_tensor(0).data[0]
+
+    # pred is 84 x N: rows 0-3 are box centre x, centre y, width, height,
+    # rows 4-83 are the per-class scores.
+    class_scores = pred[4:]
+    scores = class_scores.max(axis=0)
+    mask = scores > CONF_THRESHOLD
+    scores = scores[mask]
+    class_ids = class_scores[:, mask].argmax(axis=0)
+    cx, cy, w, h = pred[:4, mask]
+
+    # Map boxes from the letterboxed model input back to the camera frame
+    boxes = np.stack([cx - w / 2 - pad_x, cy - h / 2 - pad_y,
+                      cx + w / 2 - pad_x, cy + h / 2 - pad_y], axis=1) / scale
+
+    keep = nms(boxes, scores, class_ids)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+def choose_action(detections, frame_w, frame_h):
+    boxes, scores, class_ids = detections
+    targets = boxes[class_ids == TARGET_CLASS]
+    if len(targets) == 0:
+        return "stop"
+
+    areas = (targets[:, 2] - targets[:, 0]) * (targets[:, 3] - targets[:, 1])
+    x1, y1, x2, y2 = targets[areas.argmax()]
+    if areas.max() > STOP_AREA_FRACTION * frame_w * frame_h:
+        return "stop"
+
+    center = (x1 + x2) / 2 / frame_w
+    if center < CENTER_BAND[0]:
+        return "left"
+    elif center > CENTER_BAND[1]:
+        return "right"
+    return "forward"
+
+
+def handle_frame(jpeg_bytes):
+    # Decode one JPEG frame, run detection and pick a motor command
+    frame = cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return {"action": "stop", "error": "bad image"}
+
+    start_time = time.perf_counter()
+    with infer_lock:
+        detections = detect(frame)
+    inference_ms = round((time.perf_counter() - start_time) * 1000)
+
+    action = choose_action(detections, frame.shape[1], frame.shape[0])
+    return {"action": action, "inference_ms": inference_ms}
+
+async def ws_route(request):
+    ws = web.WebSocketResponse(compress=False)
+    await ws.prepare(request)
+    print(f"Client connected: {request.remote}")
+    # Frames are answered in the order they arrive. While one frame is being
+    # processed the client's next frame is already buffered on the socket.
+    async for msg in ws:
+        if msg.type == web.WSMsgType.BINARY:
+            # Detection runs in a worker thread so the event loop keeps reading the socket
+            result = await asyncio.to_thread(handle_frame, msg.data)
+            await ws.send_bytes(msgpack.packb(result))
+    print(f"Client disconnected: {request.remote}")
+    return ws
+
+
+app = web.Application()
+app.router.add_get("/ws", ws_route)
+
+if __name__ == "__main__":
+    # host='0.0.0.0' so the Pi can reach it over the local network
+    web.run_app(app, host="0.0.0.0", port=8000)
@@ -1,10 +1,25 @@
-from flask import Flask, render_template_string, Response
+from aiohttp import web
+import asyncio
 import cv2
-import RPi.GPIO as GPIO
+import gpiod
+from gpiod.line import Direction, Value
+import math
+import os
+import queue
+import threading
 import time
-from ultralytics import YOLO
+import numpy as np
+import onnxruntime as ort
 
-app = Flask(__name__)
+# libjpeg-turbo (NEON SIMD) for JPEG encoding. Falls back to OpenCV if missing.
+# Install with: sudo apt install libturbojpeg0 && pip install PyTurboJPEG
+try:
+    from turbojpeg import TurboJPEG
+    jpeg = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    jpeg = None
+
+routes = web.RouteTableDef()
 
 # ==========================================
 # --- 1. Hardware & Configuration Setup ---
@@ -14,21 +29,45 @@ app = Flask(__name__)
 # Adjust these to match how your L298N is wired to the Pi
 # Current assumption: IN1=17, IN2=27 (Left Motor), IN3=22, IN4=5 (Right Motor)
 IN1, IN2, IN3, IN4 = 17, 27, 22, 5
+# GPIO chip of the 40-pin header. Pi 5 on kernels older than 6.6.45 uses '/dev/gpiochip4'.
+GPIO_CHIP = '/dev/gpiochip0'
 
 # --- AI & Performance Config ---
-# How many raw video frames to show between every AI detection frame.
-# Higher number = smoother video but laggier detection boxes.
-# 3 is a good balance for Pi 4 CPU (runs AI on 1 out of every 4 frames).
+# How many camera frames to skip between AI detections. Video always streams at
+# full camera FPS; AI runs in the background and its boxes are drawn on top.
+# This is only the starting value: it is retuned from the measured inference time,
+# and always rounded up to one less than a power of two (0, 1, 3, 7, ...).
 SKIP_FRAMES = 3
 CAMERA_WIDTH = 320
 CAMERA_HEIGHT = 240
+JPEG_QUALITY = 70      # Browser stream quality (lower = less CPU and Wi-Fi bandwidth)
+JPEG_QUALITY_LOW = 60  # Used while the stream is falling behind the camera
+# Browser stream size, independent of camera and model size. Set lower than the
+# camera size (e.g. 160x120) to cut JPEG work and Wi-Fi bandwidth further.
+STREAM_WIDTH = 320
+STREAM_HEIGHT = 240
+
+# INT8 ONNX model created by calibrate.py, run with ONNX Runtime.
+# Falls back to the FP32 model from export_yolov8n.py if it hasn't been built yet.
+# MODEL_IMG_SIZE must match the imgsz used during export.
+MODEL_PATH = 'yolov8n_int8.onnx'
+FP32_MODEL_PATH = 'yolov8n.onnx'
+MODEL_IMG_SIZE = 224  # Small input = far fewer backbone FLOPs, fine for near-field objects
+CONF_THRESHOLD = 0.25  # Ignore detections below this confidence
+IOU_THRESHOLD = 0.45   # Overlap above which duplicate boxes are removed (NMS)
+NUM_THREADS = 4        # Pi 4/5 have 4 cores
 
 # --- Initialize GPIO ---
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-for pin in [IN1, IN2, IN3, IN4]:
-    GPIO.setup(pin, GPIO.OUT)
-    GPIO.output(pin, False)
+# libgpiod v2: all four motor pins are claimed as one request, so each motor
+# command below updates them together in a single call (one ioctl).
+motor_lines = gpiod.request_lines(
+    GPIO_CHIP,
+    consumer='motors',
+    config={(IN1, IN2, IN3, IN4): gpiod.LineSettings(direction=Direction.OUTPUT,
+                                                     output_value=Value.INACTIVE)},
+)
+
+ON, OFF = Value.ACTIVE, Value.INACTIVE
 
 # --- Initialize Camera ---
 camera = None
@@ -39,93 +78,327 @@ try:
         print("Warning: Camera index 0 failed. Trying index -1.")
         camera = cv2.VideoCapture(-1)
 
+    # Ask the camera for raw YUYV and skip OpenCV's own conversion to BGR.
+    # The AI worker converts YUYV straight to RGB for the model (no BGR step),
+    # and the video stream converts straight to BGR for display.
+    camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'YUYV'))
+    camera.set(cv2.CAP_PROP_CONVERT_RGB, 0)
     # IMPORTANT: Low resolution is key for Pi CPU performance
     camera.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
     camera.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
     # Lower buffer size to reduce internal video lag
     camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    # With CONVERT_RGB off, OpenCV hands over whatever format the driver picked
+    # (e.g. 1 x N MJPEG bytes). If that isn't YUYV, let OpenCV convert to BGR again.
+    if int(camera.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*'YUYV'):
+        print("Warning: camera doesn't support YUYV. Using OpenCV's BGR conversion.")
+        camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
 except Exception as e:
     print(f"Error initializing camera: {e}")
 
-# --- Initialize YOLOv8 Model ---
-print("Loading YOLOv8 Nano model... (this may download weights on first run)")
-# Using yolov8n.pt (Nano) for best speed on CPU
-model = YOLO('yolov8n.pt')
-print("Model loaded!")
+# --- Background Camera Reader ---
+class CameraReader:
+    # Reads the camera on a background thread and keeps only the newest frame.
+    # The video generator never blocks on camera.read(), and frames never pile
+    # up (stale) in OpenCV's internal buffer while inference is running.
+    # on_frame(frame_id, frame) is called from the reader thread for every new frame.
+    def __init__(self, capture, on_frame=None):
+        self.capture = capture
+        self.on_frame = on_frame
+        self.condition = threading.Condition()
+        self.latest = None
+        self.frame_id = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._reader, daemon=True)
+        self.thread.start()
+
+    def _reader(self):
+        while self.running:
+            success, frame = self.capture.read()
+            with self.condition:
+                if success:
+                    self.latest = frame
+                    # Wraps around (1..65536, never 0) so it stays a small int on long runs
+                    self.frame_id = (self.frame_id & 0xFFFF) + 1
+                else:
+                    self.running = False
+                self.condition.notify_all()
+            if success and self.on_frame:
+                self.on_frame(self.frame_id, frame)
+
+    def read(self, last_id=0):
+        # Wait for a frame newer than last_id. Returns (frame_id, frame),
+        # or (None, None) once the camera has stopped.
+        with self.condition:
+            self.condition.wait_for(lambda: self.frame_id != last_id or not self.running)
+            if not self.running:
+                return None, None
+            return self.frame_id, self.latest
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join(timeout=1)
+
+# --- Initialize YOLOv8 Model (ONNX Runtime) ---
+print("Loading YOLOv8 Nano model...")
+if not os.path.exists(MODEL_PATH):
+    print(f"Warning: {MODEL_PATH} not found. Run calibrate.py for faster INT8 inference.")
+    MODEL_PATH = FP32_MODEL_PATH
+if not os.path.exists(MODEL_PATH):
+    raise SystemExit(f"Error: {MODEL_PATH} not found. Run export_yolov8n.py first.")
+
+sess_options = ort.SessionOptions()
+sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+providers = ['CPUExecutionProvider']
+if 'XnnpackExecutionProvider' in ort.get_available_providers():
+    # XNNPACK has NEON-tuned conv kernels and its own thread pool.
+    # Keep ONNX Runtime's pool at 1 thread so the two don't fight over the cores.
+    providers.insert(0, ('XnnpackExecutionProvider', {'intra_op_num_threads': NUM_THREADS}))
+    sess_options.intra_op_num_threads = 1
+else:
+    print("Warning: XNNPACK not available in this onnxruntime build. Using default CPU kernels.")
+    sess_options.intra_op_num_threads = NUM_THREADS
+session = ort.InferenceSession(MODEL_PATH, sess_options=sess_options, providers=providers)
+input_name = session.get_inputs()[0].name
+if session.get_inputs()[0].type != 'tensor(uint8)':
+    raise SystemExit(f"Error: {MODEL_PATH} expects float input. Re-export it with export_yolov8n.py "
+                     "(and rerun calibrate.py for the INT8 model).")
+
+# Reusable buffers for preprocessing, so an AI frame allocates nothing:
+# camera frame converted to RGB -> letterboxed RGB canvas, which is the model input.
+# The model does the HWC->CHW transpose and 0..1 scaling itself (see export_yolov8n.py).
+rgb_frame = None
+letterbox_canvas = np.full((MODEL_IMG_SIZE, MODEL_IMG_SIZE, 3), 114, dtype=np.uint8)
+letterbox_frame_shape = None
+input_tensor = letterbox_canvas[None]  # 1 x H x W x 3 view, no copy
+print(f"Model loaded! ({session.get_providers()[0]})")
 
 
 # ==========================================
 # --- 2. Motor Control Functions ---
 # ==========================================
 def forward():
-    GPIO.output(IN1, True); GPIO.output(IN2, False)
-    GPIO.output(IN3, True); GPIO.output(IN4, False)
+    motor_lines.set_values({IN1: ON, IN2: OFF, IN3: ON, IN4: OFF})
 
 def backward():
-    GPIO.output(IN1, False); GPIO.output(IN2, True)
-    GPIO.output(IN3, False); GPIO.output(IN4, True)
+    motor_lines.set_values({IN1: OFF, IN2: ON, IN3: OFF, IN4: ON})
 
 def left():
     # Tank turn left
-    GPIO.output(IN1, False); GPIO.output(IN2, True)
-    GPIO.output(IN3, True); GPIO.output(IN4, False)
+    motor_lines.set_values({IN1: OFF, IN2: ON, IN3: ON, IN4: OFF})
 
 def right():
     # Tank turn right
-    GPIO.output(IN1, True); GPIO.output(IN2, False)
-    GPIO.output(IN3, False); GPIO.output(IN4, True)
+    motor_lines.set_values({IN1: ON, IN2: OFF, IN3: OFF, IN4: ON})
 
 def stop():
-    for pin in [IN1, IN2, IN3, IN4]:
-        GPIO.output(pin, False)
+    motor_lines.set_values({IN1: OFF, IN2: OFF, IN3: OFF, IN4: OFF})
 
 
 # ==========================================
-# --- 3. Video Generator with AI Skipping ---
+# --- 3. YOLOv8 Detection Helpers ---
 # ==========================================
+COCO_NAMES = (
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat',
+    'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack',
+    'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball',
+    'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket',
+    'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
+    'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
+    'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
+    'toothbrush',
+)
+
+def nms(boxes, scores, class_ids):
+    # Greedy non-maximum suppression. Boxes are shifted apart per class
+    # so that boxes of different classes never suppress each other.
+    offset_boxes = boxes + class_ids[:, None] * 4096.0
+    x1, y1, x2, y2 = offset_boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= IOU_THRESHOLD]
+    return keep
+
+def letterbox(frame):
+    # Resize the frame into the square model input canvas, keeping its aspect ratio
+    # (the unused border stays grey). Returns the scale and padding so boxes can be
+    # mapped back onto the original frame.
+    global letterbox_frame_shape
+    frame_h, frame_w = frame.shape[:2]
+    scale = min(MODEL_IMG_SIZE / frame_w, MODEL_IMG_SIZE / frame_h)
+    new_w, new_h = round(frame_w * scale), round(frame_h * scale)
+    pad_x, pad_y = (MODEL_IMG_SIZE - new_w) // 2, (MODEL_IMG_SIZE - new_h) // 2
+    if letterbox_frame_shape != (frame_h, frame_w):
+        # Camera size changed (or first frame): repaint the grey border
+        letterbox_canvas[:] = 114
+        letterbox_frame_shape = (frame_h, frame_w)
+    cv2.resize(frame, (new_w, new_h), dst=letterbox_canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+               interpolation=cv2.INTER_LINEAR)
+    return scale, pad_x, pad_y
+
+def is_yuyv(frame):
+    # Raw YUYV comes back from OpenCV as H x W x 2. H x W x 3 means OpenCV
+    # already converted to BGR.
+    return frame.ndim == 3 and frame.shape[2] == 2
+
+def detect(frame):
+    # Run YOLOv8 on a camera frame (raw YUYV or BGR).
+    # Returns (boxes, scores, class_ids) with boxes as x1, y1, x2, y2 in frame pixels.
+    global rgb_frame
+    code = cv2.COLOR_YUV2RGB_YUYV if is_yuyv(frame) else cv2.COLOR_BGR2RGB
+    rgb_frame = cv2.cvtColor(frame, code, dst=rgb_frame)
+    scale, pad_x, pad_y = letterbox(rgb_frame)
+    pred = session.run(None, {input_name: input_tensor})[0][0]
+
+    # pred is 84 x N: rows 0-3 are box centre x, centre y, width, height,
+    # rows 4-83 are the per-class scores.
+    class_scores = pred[4:]
+    scores = class_scores.max(axis=0)
+    mask = scores > CONF_THRESHOLD
+    scores = scores[mask]
+    class_ids = class_scores[:, mask].argmax(axis=0)
+    cx, cy, w, h = pred[:4, mask]
+
+    # Map boxes from the letterboxed model input back to the camera frame
+    boxes = np.stack([cx - w / 2 - pad_x, cy - h / 2 - pad_y,
+                      cx + w / 2 - pad_x, cy + h / 2 - pad_y], axis=1) / scale
+
+    keep = nms(boxes, scores, class_ids)
+    return boxes[keep], scores[keep], class_ids[keep]
+
+# One fixed box colour per class, built once at startup
+COLORS = [tuple(color) for color in np.random.default_rng(0).integers(64, 256, (len(COCO_NAMES), 3)).tolist()]
+
+def build_overlay(detections):
+    # Turn detections into ready-to-draw (p1, p2, colour, label, label position) tuples.
+    # Done once per AI result, so streamed frames only have to call cv2 to draw.
+    boxes, scores, class_ids = detections
+    overlay = []
+    for (x1, y1, x2, y2), score, class_id in zip(boxes.astype(np.int32).tolist(),
+                                                 scores.tolist(), class_ids.tolist()):
+        overlay.append(((x1, y1), (x2, y2), COLORS[class_id],
+                        f"{COCO_NAMES[class_id]} {score:.2f}", (x1, max(y1 - 4, 10))))
+    return overlay
+
+def draw_overlay(frame, overlay):
+    # Draw boxes and labels directly onto the BGR frame
+    for p1, p2, color, label, label_pos in overlay:
+        cv2.rectangle(frame, p1, p2, color, 2)
+        cv2.putText(frame, label, label_pos, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return frame
+
+
+# ==========================================
+# --- 4. Background AI Worker & Video Generator ---
+# ==========================================
+# Multipart framing around each JPEG. Written as separate chunks so the JPEG
+# bytes are never copied into a new header + frame + trailer bytes object.
+FRAME_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+FRAME_TRAILER = b'\r\n'
+
+def encode_jpeg(frame, quality=JPEG_QUALITY):
+    if jpeg:
+        return jpeg.encode(frame, quality=quality)
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality, int(cv2.IMWRITE_JPEG_OPTIMIZE), 0]
+    return cv2.imencode('.jpg', frame, params)[1].tobytes()
+
+inference_queue = queue.Queue(maxsize=1)
+latest_overlay = []
+overlay_lock = threading.Lock()
+# Current frame skip as a bit mask, retuned by the AI worker after every inference.
+# The skip is rounded up to one less than a power of two (0, 1, 3, 7, ...), so
+# "every (skip + 1)th frame" is a cheap frame_id & skip_mask == 0 test.
+skip_mask = (1 << SKIP_FRAMES.bit_length()) - 1
+camera_fps = camera.get(cv2.CAP_PROP_FPS) if camera is not None else 0
+frame_interval_ms = 1000.0 / (camera_fps if camera_fps > 0 else 30)
+
+def queue_for_inference(frame_id, frame):
+    # Called by the camera reader for every frame. Hands every (skip_mask + 1)th
+    # frame to the AI worker, replacing any queued frame it hasn't started on yet.
+    if frame_id & skip_mask:
+        return
+    try:
+        inference_queue.get_nowait()
+    except queue.Empty:
+        pass
+    inference_queue.put_nowait(frame)
+
+def inference_worker():
+    # Runs YOLO off the streaming path, so slow inference never stalls the video
+    global latest_overlay, skip_mask
+    while True:
+        frame = inference_queue.get()
+        start = time.perf_counter()
+        try:
+            overlay = build_overlay(detect(frame))
+        except Exception as e:
+            # One bad frame must not stop detection for the rest of the run
+            print(f"Inference error: {e}")
+            continue
+        infer_ms = (time.perf_counter() - start) * 1000
+        with overlay_lock:
+            latest_overlay = overlay
+        # Skip just enough frames that the next one is handed over as inference finishes.
+        # Tracks thermal throttling and scene complexity instead of a fixed guess.
+        skip_frames = max(0, math.ceil((infer_ms - frame_interval_ms) / frame_interval_ms))
+        skip_mask = (1 << skip_frames.bit_length()) - 1
+
+threading.Thread(target=inference_worker, daemon=True).start()
+
+camera_reader = None
+if camera is not None and camera.isOpened():
+    camera_reader = CameraReader(camera, on_frame=queue_for_inference)
+
 def gen_frames():
-    frame_count = 0
-    last_annotated_frame = None
+    last_frame_id = 0
 
     while True:
-        if camera is None or not camera.isOpened():
+        if camera_reader is None:
             break
 
-        success, frame = camera.read()
-        if not success:
+        # Grab the newest frame from the background reader (waits only if none is new yet)
+        frame_id, frame = camera_reader.read(last_frame_id)
+        if frame is None:
             break
+        # Frames were dropped since our last one: this viewer is falling behind, so encode smaller
+        dropped = last_frame_id and (frame_id - last_frame_id) & 0xFFFF > 1
+        quality = JPEG_QUALITY_LOW if dropped else JPEG_QUALITY
+        last_frame_id = frame_id
 
-        # --- Frame Skipping Logic ---
-        # Only run heavy AI inference if the counter hits the target interval
-        if frame_count % (SKIP_FRAMES + 1) == 0:
-            # Run YOLOv8 inference on the CPU
-            # verbose=False stops it from printing detections to terminal continually
-            results = model(frame, device='cpu', verbose=False)
-
-            # Plot the results onto the frame
-            annotated_frame = results[0].plot()
-            last_annotated_frame = annotated_frame
-            final_display = annotated_frame
+        # Overlay the most recent detection boxes from the AI worker.
+        # Video runs at full camera FPS; boxes update whenever the worker finishes.
+        with overlay_lock:
+            overlay = latest_overlay
+        if is_yuyv(frame):
+            # Converting gives a fresh BGR image, safe to draw on
+            display = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_YUYV)
+        elif overlay:
+            # A BGR frame is shared between viewers, so copy before drawing
+            display = frame.copy()
         else:
-            # Not an AI frame cycle. By default, just show the raw frame.
-            # Alternatively, uncomment below to keep showing the *last* known detection boxes
-            # if last_annotated_frame is not None:
-            #      final_display = last_annotated_frame
-            # else:
-            #      final_display = frame
-            final_display = frame
-
-        frame_count += 1
-
-        # Encode whatever we decided to display into JPEG for the browser
-        ret, buffer = cv2.imencode('.jpg', final_display)
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            display = frame
+        draw_overlay(display, overlay)
+        if display.shape[:2] != (STREAM_HEIGHT, STREAM_WIDTH):
+            display = cv2.resize(display, (STREAM_WIDTH, STREAM_HEIGHT), interpolation=cv2.INTER_AREA)
+        yield encode_jpeg(display, quality)
 
 
 # ==========================================
-# --- 4. Flask HTML Template & Routes ---
+# --- 5. HTML Template & Routes ---
 # ==========================================
 html_template = """
 <!doctype html>
@@ -152,7 +425,7 @@ html_template = """
 <body>
     <h1>YOLOv8 Nano Bot</h1>
     <div id="video-container">
-        <img src="{{ url_for('video_feed') }}">
+        <img src="/video_feed">
     </div>
     <div class="controls">
         <button class="btn-fwd" ontouchstart="sendCommand('forward')" onmousedown="sendCommand('forward')">▲</button>
@@ -181,39 +454,68 @@ html_template = """
 </html>
 """
 
-@app.route("/")
-def index():
-    return render_template_string(html_template)
+@routes.get("/")
+async def index(request):
+    return web.Response(text=html_template, content_type='text/html')
 
-@app.route("/video_feed")
-def video_feed():
-    # Return the multipart mixed response for streaming MJPEG
-    return Response(gen_frames(),
-                    mimetype='multipart/x-mixed-replace; boundary=frame')
+@routes.get("/video_feed")
+async def video_feed(request):
+    # Stream MJPEG straight from the event loop. Reading and encoding a frame
+    # blocks, so each step of gen_frames() runs in a worker thread.
+    resp = web.StreamResponse(headers={'Content-Type': 'multipart/x-mixed-replace; boundary=frame'})
+    await resp.prepare(request)
+    # Ends when gen_frames() runs out (camera stopped, see on_shutdown). The generator
+    # is never close()d here: a worker thread may still be running it.
+    frames = gen_frames()
+    try:
+        while (frame_bytes := await asyncio.to_thread(next, frames, None)) is not None:
+            await resp.write(FRAME_HEADER)
+            await resp.write(frame_bytes)
+            await resp.write(FRAME_TRAILER)
+    except ConnectionResetError:
+        pass  # Viewer closed the page
+    return resp
 
-# Unified command route using a path parameter
-@app.route("/cmd/<direction>")
-def command(direction):
+# Unified command route using a path parameter.
+# Runs right on the event loop: a motor command never waits behind a video frame.
+@routes.get("/cmd/{direction}")
+async def command(request):
+    direction = request.match_info['direction']
     if direction == "forward": forward()
     elif direction == "backward": backward()
     elif direction == "left": left()
     elif direction == "right": right()
     elif direction == "stop": stop()
-    return "", 204 # Return "No Content" success code so browser does nothing
+    return web.Response(status=204) # Return "No Content" success code so browser does nothing
+
+app = web.Application()
+app.add_routes(routes)
+
+async def on_shutdown(app):
+    # Ctrl+C: stop the motors right away, then stop the camera reader. Its stop
+    # flag makes gen_frames() return, so open video streams end instead of
+    # holding up the shutdown.
+    stop()
+    if camera_reader:
+        await asyncio.to_thread(camera_reader.stop)
+
+app.on_shutdown.append(on_shutdown)
 
 # ==========================================
-# --- 5. Main Execution & Cleanup ---
+# --- 6. Main Execution & Cleanup ---
 # ==========================================
 if __name__ == "__main__":
     try:
         # host='0.0.0.0' makes it accessible on local network IPs
-        # debug=False and threaded=True are best for performance
-        app.run(host="0.0.0.0", port=5000, debug=False, threaded=True)
+        # shutdown_timeout: don't wait long for requests still running at Ctrl+C
+        web.run_app(app, host="0.0.0.0", port=5000, shutdown_timeout=2)
     finally:
         # This block runs when you press Ctrl+C to exit
         print("\nShutting down...")
         stop()
-        GPIO.cleanup()
+        motor_lines.release()
+        if camera_reader:
+            camera_reader.stop()
         if camera and camera.isOpened():
             camera.release()
         print("Cleanup complete.")